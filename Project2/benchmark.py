@@ -0,0 +1,125 @@
+import argparse
+import os
+import statistics as stat
+import subprocess
+import sys
+import time as clock
+import random as rnd
+from hybrid import Hybrid
+from monitor import Monitor
+from simulator import Simulator
+from worlds import quarantine_world, random_world
+
+
+def import_time(statement, repeats=5):
+    """
+    Measures the cold start time of a fresh interpreter running a statement.
+    :param statement: Python statement to run, eg. 'import simulator'.
+    :param repeats: Number of interpreters to start.
+    :return: Median wall time in seconds.
+    """
+    times = []
+    for _ in range(repeats):
+        start = clock.perf_counter()
+        subprocess.run([sys.executable, '-c', statement], check=True, stderr=subprocess.DEVNULL)
+        times.append(clock.perf_counter() - start)
+    return stat.median(times)
+
+
+def bench_startup(repeats=5):
+    """
+    Compares the cold start of the headless entry point with one that loads the plotting stack up front.
+    """
+    baseline = import_time('pass', repeats)
+    headless = import_time('import executor', repeats)
+    print(f'Interpreter:            {baseline:.3f}s')
+    print(f'Headless executor:      {headless:.3f}s')
+    try:
+        plotting = import_time('import executor, matplotlib.pyplot, seaborn', repeats)
+        print(f'Executor with plotting: {plotting:.3f}s (saved {plotting - headless:.3f}s per start)')
+
+    except subprocess.CalledProcessError:
+        print('matplotlib/seaborn not installed, nothing to compare against.')
+
+
+def steps_per_second(monitor=None, num_people=300, steps=200, seed=0):
+    """
+    Measures the simulation speed of a quarantine world.
+    :param monitor: Monitor fed during the simulation, None for no feed.
+    :param num_people: Number of people in the world.
+    :param steps: Number of steps to simulate.
+    :param seed: Seed of the world, the same seed gives the same work for every measurement.
+    :return: Steps per second.
+    """
+    rnd.seed(seed)
+    sim = Simulator(world=quarantine_world(world_size=(300, 300), num_people=num_people, num_initially_infected=20,
+                                           infection_prob=0.004, infection_dist=1.9, speed=50))
+    start = clock.perf_counter()
+    sim.simulate(time=0, dt=0.5, sim_time=steps * 0.5, monitor=monitor)
+    return steps / (clock.perf_counter() - start)
+
+
+def bench_monitor(repeats=5):
+    """
+    Compares the simulation speed without a monitor, with a monitor nobody reads and with a monitor feeding a file.
+    """
+    plain = stat.median(steps_per_second() for _ in range(repeats))
+    unread = stat.median(steps_per_second(Monitor(max_positions=500)) for _ in range(repeats))
+
+    monitor = Monitor(max_positions=500)
+    monitor.start(path=os.devnull)
+    tailed = stat.median(steps_per_second(monitor) for _ in range(repeats))
+    monitor.stop()
+
+    print(f'No monitor:        {plain:.1f} steps/s')
+    print(f'Unread monitor:    {unread:.1f} steps/s ({100 * (unread / plain - 1):+.1f}%)')
+    print(f'Monitor to a file: {tailed:.1f} steps/s ({100 * (tailed / plain - 1):+.1f}%)')
+
+
+def outbreak(hybrid=None, num_people=400, seed=0):
+    """
+    Simulates a large outbreak among random walkers.
+    :param hybrid: Hybrid used during the simulation, None for agents only.
+    :param num_people: Number of people in the world.
+    :param seed: Seed of the world.
+    :return: attack_rate - Fraction of the population infected at some point.
+             wall_time - Wall time of the simulation in seconds.
+    """
+    rnd.seed(seed)
+    world = random_world(world_size=(100, 100), num_people=num_people, num_initially_infected=5, infection_prob=0.05,
+                         infection_dist=3, speed=5, delay=(rnd.gauss, 48, 6), recovery=(rnd.gauss, 96, 12), seed=seed)
+    start = clock.perf_counter()
+    Simulator(world=world).simulate(time=0, dt=1, sim_time=30 * 24, hybrid=hybrid)
+    counts = world.census()
+    return 1 - counts['never_infected'] / num_people, clock.perf_counter() - start
+
+
+def bench_hybrid(repeats=5, num_people=400):
+    """
+    Compares speed and final attack rate of agents only and the hybrid engine on the same seeds.
+    """
+    agents = [outbreak(None, num_people, seed) for seed in range(repeats)]
+    hybrids = [outbreak(Hybrid(upper=0.05, lower=0.01), num_people, seed) for seed in range(repeats)]
+    for name, results in (('Agents only', agents), ('Hybrid', hybrids)):
+        attack_rates, wall_times = zip(*results)
+        print(f'{name + ":":13}attack rate {stat.mean(attack_rates):.3f} +- {stat.stdev(attack_rates):.3f}, '
+              f'{stat.mean(wall_times):.2f}s per run')
+    speedup = stat.mean(t for _, t in agents) / stat.mean(t for _, t in hybrids)
+    print(f'Speedup: {speedup:.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks for the simulator.')
+    parser.add_argument('benchmark', choices=['startup', 'monitor', 'hybrid'])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--num-people', type=int, default=400)
+    args = parser.parse_args()
+
+    if args.benchmark == 'startup':
+        bench_startup(args.repeats)
+
+    elif args.benchmark == 'monitor':
+        bench_monitor(args.repeats)
+
+    elif args.benchmark == 'hybrid':
+        bench_hybrid(args.repeats, args.num_people)
@@ -0,0 +1,344 @@
+from executor import WORLDS, build_world, load_scenarios
+from simulator import Simulator
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import copy
+import inspect
+import json
+import math
+import random as rnd
+import time as clock
+
+
+def load_incidence(path):
+    """
+    Reads daily incidence in the format of Data_2020-04-10Ny.txt (a header line, then date and cases per line).
+    :param path: Path to data file.
+    :return: List of daily cases.
+    """
+    with open(path, 'r') as f:
+        lines = f.readlines()
+    return [int(line.split()[1]) for line in lines[1:]]
+
+
+def with_parameters(scenario, theta):
+    """
+    Copies a scenario with some of its world parameters replaced.
+    :param scenario: Scenario dictionary, see executor.default_scenario.
+    :param theta: Dictionary of parameter values. Elements of tuple parameters are named with an index, eg. tightness.0
+                  for the tightness of homes.
+    :return: New scenario dictionary.
+    """
+    scenario = copy.deepcopy(scenario)
+    params = scenario.setdefault('params', {})
+    defaults = inspect.signature(WORLDS[scenario.get('world', 'quarantine')]).parameters
+    for name, value in theta.items():
+        key, _, index = name.partition('.')
+        if index:
+            values = list(params.get(key, defaults[key].default))
+            values[int(index)] = value
+            params[key] = values
+        else:
+            params[key] = value
+    return scenario
+
+
+class IncidenceDistance:
+
+    def __init__(self, observed, scale, dt, threshold=float('Inf'), initially_infected=0):
+        """
+        Root mean square distance between the daily incidence of a running simulation and observed incidence. Used
+        as stop function of Simulator.simulate: the squared errors only grow as days are added, so the simulation is
+        aborted as soon as the partial distance exceeds the threshold, the full run could never be accepted.
+        :param observed: Observed daily incidence.
+        :param scale: Factor from simulated to observed cases, eg. observed population / simulated population.
+        :param dt: Size of time step of the simulation (hours).
+        :param threshold: Distance where the simulation is aborted.
+        :param initially_infected: Number of persons infected before the simulation starts, not counted as incidence.
+        """
+        self.observed = observed
+        self.scale = scale
+        self.dt = dt
+        self.threshold = threshold
+
+        self.incidence = []     # Simulated daily incidence.
+        self.sse = 0
+        self._ever_infected = initially_infected
+
+    @property
+    def distance(self):
+        """
+        :return: Distance of the days simulated so far, a lower bound of the final distance.
+        """
+        return math.sqrt(self.sse / len(self.observed))
+
+    def __call__(self, world, time):
+        """
+        Adds the incidence of the day when the last step of the day has been simulated.
+        :param world: Simulated world.
+        :param time: Time of the step.
+        :return: True if the distance exceeds the threshold.
+        """
+        day = len(self.incidence)
+        if day < len(self.observed) and time + self.dt >= (day + 1) * 24:
+            ever_infected = sum(1 for person in world.persons if person.infected or person.immune)
+            self.incidence.append(ever_infected - self._ever_infected)
+            self._ever_infected = ever_infected
+            self.sse += (self.scale * self.incidence[-1] - self.observed[day]) ** 2
+
+        return self.distance > self.threshold
+
+
+def run_particle(scenario, theta, seed, observed, scale, threshold):
+    """
+    Simulates a scenario with parameters theta against observed incidence.
+    :param scenario: Scenario dictionary.
+    :param theta: Dictionary of parameter values, see with_parameters.
+    :param seed: Seed of the world.
+    :param observed: Observed daily incidence.
+    :param scale: Factor from simulated to observed cases.
+    :param threshold: Distance where the simulation is aborted.
+    :return: distance - Distance to observed data (a lower bound if aborted).
+             hours - Simulated hours.
+    """
+    scenario = with_parameters(scenario, theta)
+    dt = scenario.get('dt', 0.5)
+    rnd.seed(seed)
+
+    world = build_world(scenario, seed=seed)
+    initially_infected = sum(1 for person in world.persons if person.infected or person.immune)
+    distance = IncidenceDistance(observed, scale, dt, threshold, initially_infected)
+    sim = Simulator(world=world)
+    end = sim.simulate(time=0, dt=dt, sim_time=len(observed) * 24, stop=distance)
+    return distance.distance, min(end + dt, len(observed) * 24)
+
+
+def _run_job(job):
+    """
+    Unpacks a job for the process pool.
+    """
+    return run_particle(*job)
+
+
+class ABCSMC:
+
+    def __init__(self, scenario, observed, priors, scale=1, particles=100, jobs=1, batch=None, seed=0,
+                 surrogate_slack=None, neighbours=5):
+        """
+        Approximate Bayesian computation with sequential Monte Carlo (Toni et al. 2009, Beaumont et al. 2009) of the
+        parameters of the agent based model. Every generation keeps the particles within a shrinking distance
+        threshold of the observed incidence. Simulations run in parallel batches and are aborted once their partial
+        distance exceeds the threshold.
+        :param scenario: Scenario dictionary, see executor.default_scenario.
+        :param observed: Observed daily incidence.
+        :param priors: Dictionary of uniform priors, parameter name -> (low, high). See with_parameters for names.
+        :param scale: Factor from simulated to observed cases, eg. observed population / simulated population.
+        :param particles: Number of accepted particles per generation.
+        :param jobs: Number of parallel worker processes.
+        :param batch: Number of simulations per batch. (Default=2 * jobs)
+        :param seed: Seed of the sampler, every simulation gets its own seed from it.
+        :param surrogate_slack: If given, candidates are skipped without simulating when their nearest already
+                                simulated neighbours all had a distance above surrogate_slack * threshold. Saves
+                                simulations at the cost of a slight bias. None to simulate every candidate.
+        :param neighbours: Number of neighbours of the surrogate.
+        """
+        self.scenario = scenario
+        self.observed = observed
+        self.priors = priors
+        self.scale = scale
+        self.particles = particles
+        self.jobs = jobs
+        self.batch = batch or 2 * jobs
+        self.surrogate_slack = surrogate_slack
+        self.neighbours = neighbours
+
+        self.generations = []   # Per generation: {'threshold', 'particles': [(theta, weight, distance)]}
+        self.stats = {'runs': 0, 'aborted': 0, 'screened': 0, 'simulated_hours': 0, 'saved_hours': 0}
+
+        self._rng = rnd.Random(seed)
+        self._history = []      # (normalized theta, distance) of all simulations, for the surrogate.
+
+    def run(self, generations=5, quantile=0.5, threshold=float('Inf'), max_runs=None, time_budget=None):
+        """
+        Runs the sampler.
+        :param generations: Number of generations.
+        :param quantile: The threshold of the next generation is this quantile of the accepted distances.
+        :param threshold: Threshold of the first generation, which samples from the prior.
+        :param max_runs: Maximum number of simulations in total, None for no limit.
+        :param time_budget: Maximum wall time in seconds, None for no limit. Checked between batches.
+        :return: Particles of the last complete generation, list of (theta, weight, distance).
+        """
+        deadline = None if time_budget is None else clock.perf_counter() + time_budget
+        pool = ProcessPoolExecutor(max_workers=self.jobs) if self.jobs > 1 else None
+        try:
+            for _ in range(generations):
+                previous = self.generations[-1]['particles'] if self.generations else None
+                particles = self._generation(previous, threshold, pool, max_runs, deadline)
+                if len(particles) < self.particles:
+                    break   # Out of budget.
+
+                self.generations.append({'threshold': threshold, 'particles': particles})
+                distances = sorted(distance for _, _, distance in particles)
+                threshold = distances[min(len(distances) - 1, int(quantile * len(distances)))]
+
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        return self.generations[-1]['particles'] if self.generations else []
+
+    def _generation(self, previous, threshold, pool, max_runs, deadline):
+        """
+        Samples particles until enough are within the threshold or the budget is spent.
+        :return: List of (theta, weight, distance).
+        """
+        scales = self._kernel_scales(previous) if previous else None
+        accepted = []
+        while len(accepted) < self.particles:
+            if max_runs is not None and self.stats['runs'] >= max_runs:
+                break
+            if deadline is not None and clock.perf_counter() > deadline:
+                break
+
+            candidates = []
+            screened = 0
+            while len(candidates) < self.batch:
+                candidate = self._propose(previous, scales)
+                if screened < 20 * self.batch and self._screened(candidate, threshold):
+                    screened += 1
+                    continue
+                candidates.append(candidate)
+            self.stats['screened'] += screened
+
+            jobs = [(self.scenario, candidate, self._rng.getrandbits(32), self.observed, self.scale, threshold)
+                    for candidate in candidates]
+            results = pool.map(_run_job, jobs) if pool is not None else map(_run_job, jobs)
+
+            for candidate, (distance, hours) in zip(candidates, results):
+                self.stats['runs'] += 1
+                self.stats['simulated_hours'] += hours
+                self._history.append((self._normalize(candidate), distance))
+                if distance > threshold:
+                    self.stats['aborted'] += 1
+                    self.stats['saved_hours'] += len(self.observed) * 24 - hours
+                    continue
+                accepted.append((candidate, self._weight(candidate, previous, scales), distance))
+
+        accepted = accepted[:self.particles]
+        total = sum(weight for _, weight, _ in accepted)
+        return [(theta, weight / total, distance) for theta, weight, distance in accepted]
+
+    def _propose(self, previous, scales):
+        """
+        Draws a candidate from the prior in the first generation, else perturbs a particle of the previous one.
+        """
+        if previous is None:
+            return {name: self._rng.uniform(low, high) for name, (low, high) in self.priors.items()}
+
+        weights = [weight for _, weight, _ in previous]
+        while True:
+            theta, _, _ = self._rng.choices(previous, weights)[0]
+            candidate = {name: self._rng.gauss(theta[name], scales[name]) for name in self.priors}
+            if all(low <= candidate[name] <= high for name, (low, high) in self.priors.items()):
+                return candidate
+
+    def _kernel_scales(self, previous):
+        """
+        Standard deviations of the Gaussian perturbation kernel, twice the weighted variance of the particles.
+        """
+        scales = {}
+        for name, (low, high) in self.priors.items():
+            mean = sum(weight * theta[name] for theta, weight, _ in previous)
+            var = sum(weight * (theta[name] - mean) ** 2 for theta, weight, _ in previous)
+            scales[name] = math.sqrt(2 * var) or 1e-3 * (high - low)
+        return scales
+
+    def _weight(self, candidate, previous, scales):
+        """
+        Importance weight prior(candidate) / sum_j w_j K(candidate | theta_j). The uniform prior is constant on its
+        support and cancels in the normalization.
+        """
+        if previous is None:
+            return 1
+
+        density = 0
+        for theta, weight, _ in previous:
+            density += weight * math.exp(-sum((candidate[name] - theta[name]) ** 2 / (2 * scales[name] ** 2)
+                                              for name in self.priors))
+        return 1 / density if density > 0 else 0
+
+    def _normalize(self, theta):
+        """
+        Maps parameters to [0, 1] by their prior ranges.
+        """
+        return [(theta[name] - low) / (high - low) for name, (low, high) in self.priors.items()]
+
+    def _screened(self, candidate, threshold):
+        """
+        Surrogate: True if all nearest simulated neighbours of the candidate were far off.
+        """
+        if self.surrogate_slack is None or len(self._history) < self.neighbours:
+            return False
+
+        point = self._normalize(candidate)
+        nearest = sorted(self._history, key=lambda past: sum((a - b) ** 2 for a, b in zip(point, past[0])))
+        return all(distance > self.surrogate_slack * threshold for _, distance in nearest[:self.neighbours])
+
+
+def main(argv=None):
+    """
+    Command line entry point, calibrates a scenario against observed incidence.
+    :param argv: Command line arguments (Default=sys.argv[1:]).
+    """
+    parser = argparse.ArgumentParser(description='Calibrates the agent based model with ABC-SMC.')
+    parser.add_argument('config', help='Scenario file (.toml or .json), the first scenario is calibrated.')
+    parser.add_argument('--data', default='../Data_2020-04-10Ny.txt', help='Observed daily incidence.')
+    parser.add_argument('--population', type=float, help='Population behind the data. (Default=simulated '
+                                                         'population, ie. no scaling)')
+    parser.add_argument('--prior', action='append', required=True, metavar='NAME=LOW:HIGH',
+                        help='Uniform prior of a world parameter, eg. infection_prob=0.001:0.01 or tightness.0=0:1.')
+    parser.add_argument('--particles', type=int, default=100)
+    parser.add_argument('--generations', type=int, default=5)
+    parser.add_argument('--quantile', type=float, default=0.5)
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Number of parallel worker processes.')
+    parser.add_argument('--max-runs', type=int, help='Maximum number of simulations.')
+    parser.add_argument('--time-budget', type=float, help='Maximum wall time in seconds.')
+    parser.add_argument('--surrogate', type=float, metavar='SLACK', help='Skip candidates whose neighbours were '
+                                                                         'all further off than SLACK * threshold.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help='Writes the generations as JSON to this file.')
+    args = parser.parse_args(argv)
+
+    scenario = load_scenarios(args.config)[0]
+    observed = load_incidence(args.data)
+
+    priors = {}
+    for prior in args.prior:
+        name, _, bounds = prior.partition('=')
+        low, high = map(float, bounds.split(':'))
+        priors[name] = (low, high)
+
+    world_params = inspect.signature(WORLDS[scenario.get('world', 'quarantine')]).parameters
+    num_people = scenario.get('params', {}).get('num_people', world_params['num_people'].default)
+    scale = args.population / num_people if args.population else 1
+
+    abc = ABCSMC(scenario, observed, priors, scale=scale, particles=args.particles, jobs=args.jobs, seed=args.seed,
+                 surrogate_slack=args.surrogate)
+    abc.run(generations=args.generations, quantile=args.quantile, max_runs=args.max_runs,
+            time_budget=args.time_budget)
+
+    for i, generation in enumerate(abc.generations):
+        print(f"Generation {i}: threshold {generation['threshold']:.4g}")
+        for name in priors:
+            mean = sum(weight * theta[name] for theta, weight, _ in generation['particles'])
+            print(f'    {name}: {mean:.4g}')
+    print('Runs: {runs}, aborted early: {aborted}, skipped by surrogate: {screened}, '
+          'simulated hours: {simulated_hours:.0f}, hours saved by aborting: {saved_hours:.0f}'.format(**abc.stats))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'generations': abc.generations, 'stats': abc.stats}, f)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+from executor import build_world, load_scenarios
+from simulator import Simulator
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import math
+import random as rnd
+import statistics as stat
+
+
+def final_size(r0, susceptible=1, tol=1e-10):
+    """
+    Solves the final size equation of Project1, 1 - tau - exp(-r0 * susceptible * tau) = 0, by fixed point iteration.
+    :param r0: Basic reproduction number r0.
+    :param susceptible: Fraction of the population that is susceptible.
+    :param tol: Tolerance.
+    :return: Fraction tau of the susceptibles that get infected in a major outbreak.
+    """
+    if r0 * susceptible <= 1:
+        return 0
+
+    tau = 1
+    for _ in range(1000):
+        new_tau = 1 - math.exp(-r0 * susceptible * tau)
+        if abs(new_tau - tau) < tol:
+            break
+        tau = new_tau
+    return tau
+
+
+def mean_field_prediction(world, r0):
+    """
+    Mean field prediction of the attack rate of a world before it is simulated, used as control variate. The final
+    size of the SIR model, weighted with the probability that the initially infected start a major outbreak (a
+    branching process where a person with recovery delay d infects on average r0 * d / mean delay others).
+    Depends on the realized population only, so its expectation can be estimated without simulating.
+    :param world: Constructed world.
+    :param r0: Basic reproduction number of the mean field model.
+    :return: Predicted fraction of the population infected at some point.
+    """
+    N = len(world.persons)
+    mean_delay = stat.mean(person.immune_delay for person in world.persons)
+    infected = [person for person in world.persons if person.infected]
+    susceptible = 1 - len(infected) / N
+
+    extinction = 1
+    for person in infected:
+        extinction *= min(1, mean_delay / (r0 * max(person.immune_delay, 1e-9)))
+
+    return len(infected) / N + (1 - extinction) * final_size(r0, susceptible) * susceptible
+
+
+def attack_rate(world):
+    """
+    :return: Fraction of the population that has been infected.
+    """
+    return 1 - world.census()['never_infected'] / len(world.persons)
+
+
+def run_arm(scenario, seed, antithetic=False, r0=None):
+    """
+    Runs one replicate of an arm. Arms run with the same seed share their population and the random draws of every
+    decision the policies leave unchanged (common random numbers).
+    :param scenario: Scenario dictionary of the arm.
+    :param seed: Seed of the replicate.
+    :param antithetic: True to run the antithetic twin of the replicate.
+    :param r0: Basic reproduction number for the control variate, None for no control.
+    :return: outcome - Attack rate at the end of the simulation.
+             control - Mean field prediction of the attack rate (0 if r0 is None).
+    """
+    rnd.seed(seed)
+    world = build_world(scenario, seed=seed)
+    world.rng.antithetic = antithetic
+    control = mean_field_prediction(world, r0) if r0 else 0
+
+    Simulator(world=world).simulate(time=0, dt=scenario.get('dt', 0.5), sim_time=scenario.get('sim_time', 50 * 24))
+    return attack_rate(world), control
+
+
+def _run_job(job):
+    """
+    Unpacks a job for the process pool.
+    """
+    return run_arm(*job)
+
+
+def _control_adjusted(outcomes, controls, control_mean):
+    """
+    Control variate adjustment y - b * (c - E[c]) with the regression coefficient b = cov(y, c) / var(c).
+    """
+    if len(set(controls)) < 2:
+        return list(outcomes)
+
+    mean_y, mean_c = stat.mean(outcomes), stat.mean(controls)
+    cov = sum((y - mean_y) * (c - mean_c) for y, c in zip(outcomes, controls))
+    b = cov / sum((c - mean_c) ** 2 for c in controls)
+    return [y - b * (c - control_mean) for y, c in zip(outcomes, controls)]
+
+
+class Comparison:
+
+    def __init__(self, arm_a, arm_b, r0=None, jobs=1, seed=0):
+        """
+        Estimates the difference in attack rate between two arms (eg. random_world and quarantine_world, or two
+        tightness settings) with variance reduction:
+        - common random numbers: both arms of a replicate run with the same seed, so they share the population, the
+          initially infected, the movements and the transmission draws wherever the policy does not change them.
+        - antithetic sampling: every replicate is also run with the antithetic streams (u -> 1 - u) and the pair is
+          averaged.
+        - control variates: the outcome of each arm is adjusted with the mean field prediction of the attack rate
+          of its population, whose expectation is estimated from constructed but not simulated worlds.
+        :param arm_a: Scenario dictionary of the first arm.
+        :param arm_b: Scenario dictionary of the second arm.
+        :param r0: Basic reproduction number for the control variates, None for no control variates. A scenario
+                   key 'r0' overrides it for that arm.
+        :param jobs: Number of parallel worker processes.
+        :param seed: First seed, replicate i uses seed + i.
+        """
+        self.arms = (arm_a, arm_b)
+        self.r0s = tuple(arm.get('r0', r0) for arm in self.arms)
+        self.jobs = jobs
+        self.seed = seed
+
+        self.differences = {}   # Method -> per replicate differences (a - b).
+        self.runs_per_replicate = {}    # Method -> simulations per arm and replicate.
+
+    def run(self, replicates=20, antithetic=False, independent=False, control_samples=200):
+        """
+        Runs the replicates and computes the per replicate differences of every method.
+        :param replicates: Number of replicates.
+        :param antithetic: True to also run the antithetic twins (doubles the simulations).
+        :param independent: True to also run the second arm with unrelated seeds, the baseline without common random
+                            numbers.
+        :param control_samples: Number of constructed worlds per arm for the expectation of the control variate.
+        :return: Dictionary of method -> list of differences.
+        """
+        seeds = [self.seed + i for i in range(replicates)]
+        twins = (False, True) if antithetic else (False,)
+        jobs = [(arm, seed, twin, r0) for arm, r0 in zip(self.arms, self.r0s) for seed in seeds for twin in twins]
+        if independent:
+            jobs += [(self.arms[1], seed + 10 ** 6, False, self.r0s[1]) for seed in seeds]
+
+        if self.jobs > 1:
+            with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+                results = list(pool.map(_run_job, jobs))
+        else:
+            results = [_run_job(job) for job in jobs]
+
+        # Per arm and replicate: (outcome, control) averaged over the twins.
+        per_arm = []
+        for arm in range(2):
+            offset = arm * len(seeds) * len(twins)
+            arm_results = []
+            for i in range(len(seeds)):
+                pair = results[offset + i * len(twins): offset + (i + 1) * len(twins)]
+                arm_results.append((stat.mean(y for y, _ in pair), stat.mean(c for _, c in pair)))
+            per_arm.append(arm_results)
+
+        (a, control_a), (b, control_b) = [list(zip(*arm_results)) for arm_results in per_arm]
+        method = 'crn + antithetic' if antithetic else 'crn'
+        self.differences[method] = [y_a - y_b for y_a, y_b in zip(a, b)]
+        self.runs_per_replicate[method] = len(twins)
+
+        if independent:
+            # Only the plain run of arm A, one simulation per arm like the baseline it stands for.
+            a_independent = [results[i * len(twins)][0] for i in range(len(seeds))]
+            b_independent = [y for y, _ in results[-len(seeds):]]
+            self.differences['independent'] = [y_a - y_b for y_a, y_b in zip(a_independent, b_independent)]
+            self.runs_per_replicate['independent'] = 1
+
+        if all(self.r0s):
+            control_means = [self._control_mean(arm, r0, control_samples) for arm, r0 in zip(self.arms, self.r0s)]
+            adjusted_a = _control_adjusted(a, control_a, control_means[0])
+            adjusted_b = _control_adjusted(b, control_b, control_means[1])
+            self.differences[method + ' + control variate'] = [y_a - y_b for y_a, y_b in zip(adjusted_a, adjusted_b)]
+            self.runs_per_replicate[method + ' + control variate'] = len(twins)
+
+        return self.differences
+
+    def _control_mean(self, arm, r0, samples):
+        """
+        Expectation of the control variate of an arm, from worlds that are constructed but never simulated.
+        """
+        predictions = []
+        for i in range(samples):
+            seed = self.seed + 2 * 10 ** 6 + i
+            rnd.seed(seed)
+            predictions.append(mean_field_prediction(build_world(arm, seed=seed), r0))
+        return stat.mean(predictions)
+
+    def summary(self, confidence=0.95, target=None):
+        """
+        Confidence interval half widths of the difference as a function of the number of replicates.
+        :param confidence: Confidence level of the intervals (normal approximation).
+        :param target: Wanted half width, used to estimate the number of simulations needed.
+        :return: Dictionary of method -> {'mean', 'half_widths': [(simulations per arm, half width)],
+                 'simulations_for_target'}
+        """
+        z = stat.NormalDist().inv_cdf((1 + confidence) / 2)
+        summary = {}
+        for method, differences in self.differences.items():
+            runs = self.runs_per_replicate[method]
+            checkpoints = sorted({2 ** k for k in range(1, int(math.log2(len(differences))) + 1)} | {len(differences)})
+            half_widths = [(n * runs, z * stat.stdev(differences[:n]) / math.sqrt(n)) for n in checkpoints if n >= 2]
+
+            needed = None
+            if target is not None and len(differences) >= 2:
+                needed = math.ceil((z * stat.stdev(differences) / target) ** 2) * runs
+            summary[method] = {'mean': stat.mean(differences), 'half_widths': half_widths,
+                               'simulations_for_target': needed}
+        return summary
+
+
+def main(argv=None):
+    """
+    Command line entry point, compares two scenarios.
+    :param argv: Command line arguments (Default=sys.argv[1:]).
+    """
+    parser = argparse.ArgumentParser(description='Compares the attack rate of two scenarios with variance reduction.')
+    parser.add_argument('configs', nargs='+', help='Scenario files (.toml or .json).')
+    parser.add_argument('--arms', nargs=2, required=True, metavar=('A', 'B'), help='Names of the two scenarios.')
+    parser.add_argument('-r', '--replicates', type=int, default=20)
+    parser.add_argument('--antithetic', action='store_true', help='Also run the antithetic twin of every replicate.')
+    parser.add_argument('--independent', action='store_true', help='Also run the baseline without common random '
+                                                                   'numbers.')
+    parser.add_argument('--r0', type=float, help='R_0 of the mean field control variate, no control variate if '
+                                                 'not given.')
+    parser.add_argument('--target', type=float, help='Wanted half width of the confidence interval.')
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Number of parallel worker processes.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    scenarios = {scenario['name']: scenario for path in args.configs for scenario in load_scenarios(path)}
+    comparison = Comparison(scenarios[args.arms[0]], scenarios[args.arms[1]], r0=args.r0, jobs=args.jobs,
+                            seed=args.seed)
+    comparison.run(replicates=args.replicates, antithetic=args.antithetic, independent=args.independent)
+
+    for method, result in comparison.summary(args.confidence, args.target).items():
+        print(f"{method}: difference {result['mean']:.4f}")
+        for simulations, half_width in result['half_widths']:
+            print(f'    {simulations:5d} simulations per arm: +- {half_width:.4f}')
+        if result['simulations_for_target'] is not None:
+            print(f"    {result['simulations_for_target']} simulations per arm for +- {args.target}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,224 +1,203 @@
-from person import *
 from simulator import Simulator
-from building import Building
-from world import World
+from worlds import random_world, quarantine_world, worker_world
+from hybrid import Hybrid
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
 import random as rnd
-
-if __name__ == '__main__':
-
-    def random_world(world_size=(1000, 1000), num_people=500, num_initially_infected=1,  pop_distr=(0.6, 0.3, 0.1),
-                     infection_prob=0.02, infection_dist=2, speed=10, avg_persons_per_household=4,
-                     avg_pupils_per_school=100, avg_persons_per_workplace=50, tightness=(0.9, 0.3, 0.1),
-                     delay=(rnd.gauss, 7, 1), recovery=(rnd.gauss, 14, 2)):
-
-        """
-        Constructs a society with Random walkers.
-        :param world_size: Size of the world.
-        :param num_people: Number of people in the world.
-        :param num_initially_infected: Number of initially infected
-        :param pop_distr: Proportions of people. Eg. (0.6, 0.3, 0.1) means 60% workers, 30% students and 10% others.
-        :param infection_prob: Probability of infecting.
-        :param infection_dist: Max distance infection can spread.
-        :param speed: Speed of person.
-        :param avg_persons_per_household: Average number people living in a house.
-        :param avg_pupils_per_school: Average number of students per school.
-        :param avg_persons_per_workplace: Average number of people per work place.
-        :param tightness: Tightness scaling parameter to tackle differences in sparseness and denseness in different buildings.
-        :param delay: Delay information, (density function, parameter 1, parameter 2)
-        :param recovery: Recovery information, (density function, parameter 1, parameter 2)
-        :return: World.
-        """
-        world_size = world_size
-        num_people = num_people
-
-        random_pos = lambda _: (rnd.uniform(0, world_size[0]), rnd.uniform(0, world_size[1]))
-
-        delay_func, delay_param1, delay_param2 = delay
-        recovery_func, recovery_param1, recovery_param2 = recovery
-
-        persons = [RandomPerson(infected=False, starting_pos=random_pos(None), speed=speed, infection_dist=infection_dist,
-                                infection_prob=infection_prob, symptom_delay=delay_func(delay_param1, delay_param2),
-                                time_until_recovery=recovery_func(recovery_param1, recovery_param2), home=None,
-                                work=None) for _ in range(num_people)]
-
-        rnd.shuffle(persons)
-        for i in range(num_initially_infected):
-            persons[i].gets_infected(time=0)
-
-        return World(world_size=world_size, persons=persons, buildings=[])
-
-    def quarantine_world(world_size=(1000, 1000), num_people=500, num_initially_infected=1, pop_distr=(0.6, 0.3, 0.1),
-                         infection_prob=0.02, infection_dist=2, speed=10, avg_persons_per_household=4,
-                         avg_pupils_per_school=100, avg_persons_per_workplace=50, tightness=(0.9, 0.3, 0.1),
-                         delay=(rnd.gauss, 7, 1), recovery=(rnd.gauss, 14, 2)):
-
-        """
-        Constructs a society with Quarantine persons.
-        :param world_size: Size of the world.
-        :param num_people: Number of people in the world.
-        :param num_initially_infected: Number of initially infected.
-        :param pop_distr: Proportions of people. Eg. (0.6, 0.3, 0.1) means 60% workers, 30% students and 10% others.
-        :param infection_prob: Probability of infecting.
-        :param infection_dist: Max distance infection can spread.
-        :param speed: Speed of person.
-        :param avg_persons_per_household: Average number people living in a house.
-        :param avg_pupils_per_school: Average number of students per school.
-        :param avg_persons_per_workplace: Average number of people per work place.
-        :param tightness: Tightness scaling parameter to tackle differences in sparseness and denseness in different buildings.
-        :param delay: Delay information, (density function, parameter 1, parameter 2)
-        :param recovery: Recovery information, (density function, parameter 1, parameter 2)
-        :return: World.
-        """
-
-        world_size = world_size
-        num_people = num_people
-
-        random_pos = lambda _: (rnd.uniform(0, world_size[0]), rnd.uniform(0, world_size[1]))
-
-        homes = [Building(pos=random_pos(None), _type='Home', tightness=tightness[0])
-                 for _ in range(max(1, num_people // avg_persons_per_household))]
-
-        # Starts at home:
-        home_which_people_live_in = [rnd.choice(homes) for _ in range(num_people)]
-
-        delay_func, delay_param1, delay_param2 = delay
-        recovery_func, recovery_param1, recovery_param2 = recovery
-
-        persons = [QuarantinePerson(infected=False, starting_pos=home_which_people_live_in[person].pos, speed=speed,
-                                    infection_dist=infection_dist, infection_prob=infection_prob,
-                                    symptom_delay=delay_func(delay_param1, delay_param2),
-                                    time_until_recovery=recovery_func(recovery_param1, recovery_param2),
-                                    home=home_which_people_live_in[person], work=None)
-                   for person in range(num_people)]
-
-        rnd.shuffle(persons)
-        for i in range(num_initially_infected):
-            persons[i].gets_infected(time=0)
-
-        return World(world_size=world_size, persons=persons, buildings=homes)
-
-    def worker_world(world_size=(1000, 1000), num_people=500, num_initially_infected=1, pop_distr=(0.6, 0.3, 0.1),
-                     infection_prob=0.02, infection_dist=2, speed=10, avg_persons_per_household=4,
-                     avg_pupils_per_school=100, avg_persons_per_workplace=50, tightness=(0.9, 0.3, 0.1),
-                     delay=(rnd.gauss, 7, 1), recovery=(rnd.gauss, 14, 2)):
-
-        """
-        Constructs a society with workers, students and others.
-        :param world_size: Size of the world.
-        :param num_people: Number of people in the world.
-        :param num_initially_infected: Number of initially infected.
-        :param pop_distr: Proportions of people. Eg. (0.6, 0.3, 0.1) means 60% workers, 30% students and 10% others.
-        :param infection_prob: Probability of infecting.
-        :param infection_dist: Max distance infection can spread.
-        :param speed: Speed of person.
-        :param avg_persons_per_household: Average number people living in a house.
-        :param avg_pupils_per_school: Average number of students per school.
-        :param avg_persons_per_workplace: Average number of people per work place.
-        :param tightness: Tightness scaling parameter to tackle differences in sparseness and denseness in different buildings.
-        :param delay: Delay information, (density function, parameter 1, parameter 2)
-        :param recovery: Recovery information, (density function, parameter 1, parameter 2)
-        :return: World.
-        """
-
-        world_size = world_size
-        num_people = num_people
-
-        pop_distr = pop_distr   # Proportion that oes to school, works, other such as infants and elderly.
-
-        num_young, num_workers, num_other = [int(num_people * prop) for prop in pop_distr]
-
-        random_pos = lambda _: (rnd.uniform(0, world_size[0]), rnd.uniform(0, world_size[1]))
-
-        homes = [Building(pos=random_pos(None), _type='Home', tightness=tightness[0])
-                 for _ in range(max(1, num_people // avg_persons_per_household))]
-        schools = [Building(pos=random_pos(None), _type='School', tightness=tightness[1])
-                   for _ in range(max(1, num_young // avg_pupils_per_school))]
-        works = [Building(pos=random_pos(None), _type='Work', tightness=tightness[2])
-                 for _ in range(max(1, num_workers // avg_persons_per_workplace))]
-
-        # Starts at home:
-        home_which_people_live_in = [rnd.choice(homes) for _ in range(num_people)]
-
-        delay_func, delay_param1, delay_param2 = delay
-        recovery_func, recovery_param1, recovery_param2 = recovery
-
-        youngs = [Worker(infected=False, starting_pos=home_which_people_live_in[person].pos, speed=speed,
-                         infection_dist=infection_dist, infection_prob=infection_prob,
-                         symptom_delay=delay_func(delay_param1, delay_param2),
-                         time_until_recovery=recovery_func(recovery_param1, recovery_param2),
-                         home=home_which_people_live_in[person],
-                         work=rnd.choice(schools)) for person in range(0, num_young)]
-
-        workers = [Worker(infected=False, starting_pos=home_which_people_live_in[person].pos, speed=speed,
-                          infection_dist=infection_dist, infection_prob=infection_prob,
-                          symptom_delay=delay_func(delay_param1, delay_param2),
-                          time_until_recovery=recovery_func(recovery_param1, recovery_param2),
-                          home=home_which_people_live_in[person], work=rnd.choice(works))
-                   for person in range(num_young, num_young + num_workers)]
-
-        others = [QuarantinePerson(infected=False, starting_pos=home_which_people_live_in[person].pos, speed=speed,
-                                   infection_dist=infection_dist, infection_prob=infection_prob,
-                                   symptom_delay=delay_func(delay_param1, delay_param2),
-                                   time_until_recovery=recovery_func(recovery_param1, recovery_param2),
-                                   home=home_which_people_live_in[person], work=None)
-                  for person in range(num_young + num_workers, num_young + num_workers + num_other)]
-
-        persons = youngs + workers + others
-
-        rnd.shuffle(persons)
-        for i in range(num_initially_infected):
-            persons[i].gets_infected(time=0)
-
-        return World(world_size=world_size, persons=persons, buildings=homes + schools + works)
-
-    ####################################################################################################################
-    # MODIFY FROM HERE!
+import time as clock
+
+WORLDS = {
+    'random': random_world,
+    'quarantine': quarantine_world,
+    'worker': worker_world
+}
+
+DISTRIBUTIONS = {
+    'gauss': rnd.gauss,
+    'uniform': rnd.uniform,
+    'lognormvariate': rnd.lognormvariate
+}
+
+
+def default_scenario():
+    """
+    The scenario that used to be hard coded in this file, used when no config is given.
+    :return: Scenario dictionary.
+    """
     R_0 = 2.5
 
     dt = 0.5
     tau = 14 * 24
 
-    kwargs = {
-        'world_size': (300, 300),
-        'num_people': 432,
-        'num_initially_infected': 50,
-        'pop_distr': (0.6, 0.3, 0.1),
-        'infection_prob': dt * (R_0 / tau),  # R_0 = beta * tau -> beta = R_0 / tau, to adjust for
-        # different step sizes we multiply by dt
-        'infection_dist': 1.9,    # maximum is 1.9m since 2m are advised distancing.
-        'speed': dt * 100,    # Moves 0.1km/h when random walking
-        # (might seem slow, but may be reasonable since people usually stops and sit down most time when outside)
-        'avg_persons_per_household': 4,
-        'avg_pupils_per_school': 100,
-        'avg_persons_per_workplace': 50,
-        'tightness': (0.8, 0.3, 0.1),   # Homes are usually very tight, then schools are tighter than companies.
-        'delay': (rnd.gauss, 7*24, 1 * 24),
-        'recovery': (rnd.gauss, tau, 2 * 24)
+    return {
+        'name': 'default',
+        'world': 'quarantine',
+        'dt': dt,
+        'sim_time': 50 * 24,
+        'params': {
+            'world_size': (300, 300),
+            'num_people': 432,
+            'num_initially_infected': 50,
+            'pop_distr': (0.6, 0.3, 0.1),
+            'infection_prob': dt * (R_0 / tau),  # R_0 = beta * tau -> beta = R_0 / tau, to adjust for
+            # different step sizes we multiply by dt
+            'infection_dist': 1.9,    # maximum is 1.9m since 2m are advised distancing.
+            'speed': dt * 100,    # Moves 0.1km/h when random walking
+            # (might seem slow, but may be reasonable since people usually stops and sit down most time when outside)
+            'avg_persons_per_household': 4,
+            'avg_pupils_per_school': 100,
+            'avg_persons_per_workplace': 50,
+            'tightness': (0.8, 0.3, 0.1),   # Homes are usually very tight, then schools are tighter than companies.
+            'delay': ('gauss', 7*24, 1 * 24),
+            'recovery': ('gauss', tau, 2 * 24)
+        }
     }
 
-    sim = Simulator(world=quarantine_world(**kwargs))
-
-    immunes = 0
-    symptomatic = 0
-    infected = 0
-    never_infected = 0
-    sim.simulate(time=0, dt=dt, sim_time=50 * 24, disp=False, see_progress=True)
-    sim.plot_distributions()
-    for person in sim.world.persons:
-        if person.immune:
-            immunes += 1
 
-        elif person.symptomatic:
-            symptomatic += 1
+def load_scenarios(path):
+    """
+    Reads scenarios from a TOML or JSON file. The file either holds a single scenario at the top level or a list of
+    scenarios under the key 'scenario' (i.e. [[scenario]] tables in TOML).
+    :param path: Path to config file, the format is decided by the file extension.
+    :return: List of scenario dictionaries.
+    """
+    if path.endswith('.toml'):
+        try:
+            import tomllib
+            with open(path, 'rb') as f:
+                config = tomllib.load(f)
+
+        except ImportError:     # Python < 3.11
+            import toml
+            with open(path, 'r') as f:
+                config = toml.load(f)
+
+    else:
+        with open(path, 'r') as f:
+            config = json.load(f)
+
+    scenarios = config['scenario'] if 'scenario' in config else [config]
+    for i, scenario in enumerate(scenarios):
+        scenario.setdefault('name', f'{path}:{i}')
+
+    return scenarios
+
+
+def build_world(scenario, seed=None):
+    """
+    Constructs the world described by a scenario.
+    :param scenario: Scenario dictionary, see default_scenario() for the keys.
+    :param seed: Seed for counter based random numbers during the simulation, None for the global random module.
+    :return: World.
+    """
+    params = dict(scenario.get('params', {}))
+    for key in ('delay', 'recovery'):
+        if key in params:
+            func, param1, param2 = params[key]
+            params[key] = (DISTRIBUTIONS[func], param1, param2)
+
+    for key in ('world_size', 'pop_distr', 'tightness'):
+        if key in params:
+            params[key] = tuple(params[key])
+
+    return WORLDS[scenario.get('world', 'quarantine')](**params, seed=seed)
+
+
+def run_scenario(scenario, replicate=0, see_progress=False, plot=False, monitor=None):
+    """
+    Runs one replicate of a scenario.
+    :param scenario: Scenario dictionary.
+    :param replicate: Replicate number, offsets the seed of the scenario.
+    :param see_progress: True for print outs of % done of the simulation.
+    :param plot: True for plotting the infection time distributions after the simulation.
+    :param monitor: Monitor fed with live snapshots of the simulation, None for no feed.
+    :return: Dictionary with the final state counts of the world.
+    """
+    seed = scenario.get('seed')
+    if seed is not None:
+        seed += replicate
+        rnd.seed(seed)
+
+    start = clock.perf_counter()
+    sim = Simulator(world=build_world(scenario, seed=seed))
+    hybrid = Hybrid(**scenario['hybrid']) if 'hybrid' in scenario else None
+    sim.simulate(time=0, dt=scenario.get('dt', 0.5), sim_time=scenario.get('sim_time', 50 * 24),
+                 disp=scenario.get('disp', False), see_progress=see_progress, monitor=monitor, hybrid=hybrid)
+    if plot:
+        sim.plot_distributions()
+
+    result = {'scenario': scenario['name'], 'replicate': replicate, 'seed': seed}
+    result.update(sim.world.census())
+    if hybrid is not None:
+        result['switches'] = hybrid.switches
+    result['wall_time'] = clock.perf_counter() - start
+    return result
+
+
+def _run_job(job):
+    """
+    Unpacks a job for the process pool.
+    """
+    return run_scenario(*job)
+
+
+def main(argv=None):
+    """
+    Command line entry point. Runs every replicate of every scenario headless unless plotting is asked for.
+    :param argv: Command line arguments (Default=sys.argv[1:]).
+    """
+    parser = argparse.ArgumentParser(description='Runs agent based infection spread simulations.')
+    parser.add_argument('configs', nargs='*', help='Scenario files (.toml or .json). Runs the default scenario if '
+                                                   'none are given.')
+    parser.add_argument('-r', '--replicates', type=int, help='Overrides the number of replicates of every scenario.')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Number of parallel worker processes.')
+    parser.add_argument('-o', '--output', help='Appends one JSON line per run to this file.')
+    parser.add_argument('--progress', action='store_true', help='Print % done of every simulation.')
+    parser.add_argument('--plot', action='store_true', help='Plot the infection time distributions (loads '
+                                                            'matplotlib and seaborn).')
+    parser.add_argument('--monitor-port', type=int, help='Serves a live dashboard on http://127.0.0.1:PORT/.')
+    parser.add_argument('--monitor-file', help='Appends live snapshots as JSON lines to this file.')
+    parser.add_argument('--monitor-positions', type=int, default=500, help='Maximum number of positions per '
+                                                                           'snapshot (0 for counts only).')
+    args = parser.parse_args(argv)
+
+    monitor = None
+    if args.monitor_port is not None or args.monitor_file is not None:
+        if args.jobs > 1:
+            parser.error('live monitoring needs --jobs 1')
+        from monitor import Monitor     # Pulls in asyncio, only loaded when monitoring.
+        monitor = Monitor(max_positions=args.monitor_positions)
+        monitor.start(port=args.monitor_port, path=args.monitor_file)
+
+    scenarios = [scenario for path in args.configs for scenario in load_scenarios(path)] or [default_scenario()]
+
+    jobs = []
+    for scenario in scenarios:
+        replicates = args.replicates if args.replicates is not None else scenario.get('replicates', 1)
+        jobs += [(scenario, replicate, args.progress, args.plot) for replicate in range(replicates)]
+
+    if args.jobs > 1 and not args.plot:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(_run_job, jobs))
+    else:
+        results = [run_scenario(*job, monitor=monitor) for job in jobs]
+
+    if monitor is not None:
+        monitor.stop()
+
+    for result in results:
+        print(f"{result['scenario']} (replicate {result['replicate']}):")
+        print('Immunes: ', result['immunes'])
+        print('Symptomatic:', result['symptomatic'])
+        print('Infected:', result['infected'])
+        print('Never infected:', result['never_infected'])
+
+    if args.output:
+        with open(args.output, 'a') as f:
+            for result in results:
+                f.write(json.dumps(result) + '\n')
 
-        elif person.infected:
-            infected += 1
-
-        else:
-            never_infected += 1
-
-    print('Immunes: ', immunes)
-    print('Symptomatic:', symptomatic)
-    print('Infected:', infected)
-    print('Never infected:', never_infected)
 
+if __name__ == '__main__':
+    main()
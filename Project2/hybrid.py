@@ -0,0 +1,225 @@
+from rng import HYBRID, time_to_step
+from seir import SEIR
+from collections import deque
+import bisect
+
+
+class Hybrid:
+
+    def __init__(self, upper=0.05, lower=0.01, window=48):
+        """
+        Switches Simulator.simulate between the agent based model and a mean field SIR model (SEIR without latent
+        period, since persons in the agent based model are infectious from the moment they are infected).
+        Agents are simulated while infections are rare, where chance matters (eg. early extinction). Once the
+        prevalence reaches upper the compartments are handed to the mean field model, which only costs a few
+        operations per step instead of a contact check between every pair of persons. When the prevalence falls
+        below lower the compartments are handed back to the agents.
+
+        The transmission rate of the mean field model is estimated from the infections of the last window hours of
+        agent based simulation and the recovery rate from the recovery delays of the persons. The accuracy is therefore
+        limited by how well a homogeneous mixing rate measured at low prevalence describes the outbreak at high
+        prevalence, local depletion of susceptibles around the infected is not captured (see benchmark.py hybrid).
+        Quarantine is not modelled in the mean field phase either, symptomatic persons keep spreading at the same rate.
+        :param upper: Prevalence (fraction of the population infected) where the mean field model takes over.
+        :param lower: Prevalence where the agent based model takes over again.
+        :param window: Hours of agent based simulation used to estimate the transmission rate.
+        """
+        if not 0 <= lower < upper <= 1:
+            raise ValueError(f'Hybrid needs 0 <= lower < upper <= 1, got lower={lower} and upper={upper}')
+
+        self.upper = upper
+        self.lower = lower
+        self.window = window
+
+        self.mean_field = False
+        self.state = None       # (S, E, I, R) of the mean field model.
+        self.params = None      # (beta, rho, gam) of the mean field model, per hour.
+        self.switches = []      # (time, 'mean field', 'agents' or 'end' if the simulation ended in the mean field)
+
+        self._seir = SEIR()
+        self._observations = deque()    # (time, dt * S * I / N, new infections) of the last agent based steps.
+        self._last = None               # (S, I, ever infected) after the last agent based step.
+        self._handoff = None            # (S, I, R) when the mean field model took over.
+        self._incidence = ([], [])      # Step times and cumulative infections during the mean field phase.
+        self._infected = []             # Infected persons at the hand over, by immune time.
+        self._delays = None             # Mean (symptom delay, recovery delay) of the persons.
+        self._time = 0
+
+    def observe(self, world, time, dt):
+        """
+        Records an agent based step, and hands over to the mean field model if the prevalence is high enough.
+        :param world: World after the step.
+        :param time: Time of the step.
+        :param dt: Size of time step.
+        """
+        self._time = time
+        counts = world.census()
+        N = len(world.persons)
+        S, I, R = counts['never_infected'], counts['infected'] + counts['symptomatic'], counts['immunes']
+
+        if self._last is not None:
+            S_prev, I_prev, ever_prev = self._last
+            self._observations.append((time, dt * S_prev * I_prev / N, I + R - ever_prev))
+        while self._observations and self._observations[0][0] <= time - self.window:
+            self._observations.popleft()
+        self._last = (S, I, I + R)
+
+        exposure = sum(exposure for _, exposure, _ in self._observations)
+        infections = sum(infections for _, _, infections in self._observations)
+        if I / N < self.upper or not infections:
+            return
+
+        delays = [person.immune_delay for person in world.persons]
+        self.params = (infections / exposure / N, None, len(delays) / sum(delays))
+        self._delays = (sum(person.symptom_delay for person in world.persons) / N, sum(delays) / N)
+        self.state = (S, 0, I, R)
+        self._handoff = (S, I, R)
+        self._incidence = ([], [])
+        self._infected = sorted((person for person in world.persons if person.infected), key=lambda p: p.immune_time)
+        self.mean_field = True
+        self.switches.append((time, 'mean field'))
+        world.aggregate = self.census()
+
+    def step(self, world, time, dt):
+        """
+        Integrates the mean field model one step, and hands back to the agents if the prevalence is low enough.
+        :param world: World, frozen during the mean field phase.
+        :param time: Time of the step.
+        :param dt: Size of time step.
+        """
+        self._time = time
+        new_state = self._seir.step(self.state, self.params, dt)
+        times, cumulative = self._incidence
+        times.append(time)
+        cumulative.append((cumulative[-1] if cumulative else 0) + self.state[0] - new_state[0])
+        self.state = new_state
+
+        world.aggregate = self.census()
+        if self.state[2] / len(world.persons) < self.lower:
+            self._disaggregate(world, time)
+
+    def finish(self, world):
+        """
+        Hands back to the agents if the simulation ends in the mean field phase, so that the persons of the world
+        always reflect the final compartments. Recorded as an 'end' switch.
+        :param world: World.
+        """
+        if self.mean_field:
+            self._disaggregate(world, self._time, label='end')
+
+    def census(self):
+        """
+        :return: Rounded compartments of the mean field model, in the format of World.census. Infected are split
+                 into symptomatic and not the way _disaggregate would assign them: the persons infected at the hand
+                 over by their own symptom times, the new infections by the share of the mean field incidence of the
+                 last recovery delay that is older than the symptom delay.
+        """
+        S, I, R = self._rounded()
+        staying = self._infected[R - self._handoff[2]:]
+        symptomatic = sum(1 for person in staying if person.symptom_time <= self._time)
+
+        new = I - len(staying)
+        if new:
+            symptom_delay, immune_delay = self._delays
+            start, infected = self._cumulative(self._time - immune_delay), self._cumulative(self._time)
+            if infected > start:
+                share = max(0, self._cumulative(self._time - symptom_delay) - start) / (infected - start)
+            else:   # Uniform infection times, see _infection_time.
+                share = max(0, 1 - symptom_delay / immune_delay)
+            symptomatic += round(new * share)
+        return {'immunes': R, 'symptomatic': symptomatic, 'infected': I - symptomatic, 'never_infected': S}
+
+    def _rounded(self):
+        """
+        Rounds the mean field compartments to integers with the same total. The ever infected and the recovered only
+        grow, so they are rounded on their own and the infected are the rest. That way the counts are monotone from
+        step to step, and never undo infections or recoveries of the agents at the hand over.
+        :return: (S, I, R)
+        """
+        S, _, _, R = self.state
+        S_handoff, I_handoff, R_handoff = self._handoff
+        total = S_handoff + I_handoff + R_handoff
+
+        S = min(total - round(total - S), S_handoff)
+        R = min(max(round(R), R_handoff), total - S)
+        return S, total - S - R, R
+
+    def _cumulative(self, time):
+        """
+        :return: Mean field infections up to and including time.
+        """
+        times, cumulative = self._incidence
+        i = bisect.bisect_right(times, time)
+        return cumulative[i - 1] if i else 0
+
+    def _infection_time(self, u, low, high):
+        """
+        Draws an infection time from the mean field incidence within (low, high] by inverting its cumulative sum.
+        If there were no infections in the interval, the time is drawn uniformly in it.
+        :param u: Uniform random number in [0, 1).
+        :param low: Start of the interval (exclusive).
+        :param high: End of the interval (inclusive).
+        :return: Infection time.
+        """
+        times, cumulative = self._incidence
+        first, last = bisect.bisect_right(times, low), bisect.bisect_right(times, high) - 1
+        before = cumulative[first - 1] if first > 0 else 0
+        if last < first or cumulative[last] <= before:
+            return high - u * (high - low)
+
+        target = before + u * (cumulative[last] - before)
+        return times[min(max(bisect.bisect_left(cumulative, target), first), last)]
+
+    def _disaggregate(self, world, time, label='agents'):
+        """
+        Maps the mean field compartments back onto the persons, so that the counts of the world afterwards are
+        exactly the rounded compartments. The persons infected before the mean field phase recover first, as they
+        were infected earliest. The new infections are given to randomly chosen susceptibles: the ones that have
+        recovered get infection times from the mean field incidence at least one recovery delay ago, the ones still
+        infected from the incidence of their last recovery delay, so that they have the rest of their infectious
+        period ahead of them when the agents take over.
+        :param world: World.
+        :param time: Current time.
+        :param label: Label of the switch, 'agents' for a hand back or 'end' at the end of the simulation.
+        """
+        S, I, R = self._rounded()
+        S_handoff, _, R_handoff = self._handoff
+        step = time_to_step(time)
+        for person in world.persons:
+            person.step = step
+
+        recoveries = R - R_handoff
+        infected = sorted((person for person in world.persons if person.infected), key=lambda p: p.immune_time)
+        recovered, staying = infected[:recoveries], infected[recoveries:]
+        for person in staying:
+            if person.immune_time <= time:     # Resample the rest of the infectious period.
+                person.immune_time = time + (1 - person._random(HYBRID, 2)) * person.immune_delay
+
+        susceptibles = [person for person in world.persons if not person.infected and not person.immune]
+        susceptibles.sort(key=lambda person: person._random(HYBRID))
+        newly_infected = susceptibles[:S_handoff - S]
+        new_recoveries = recoveries - len(recovered)
+        start = self._incidence[0][0] - 1 if self._incidence[0] else time - 1
+        for i, person in enumerate(newly_infected):
+            u = person._random(HYBRID, 1)
+            if i < new_recoveries:
+                person.gets_infected(time=self._infection_time(u, start, max(start, time - person.immune_delay)))
+                recovered.append(person)
+            else:
+                person.gets_infected(time=self._infection_time(u, time - person.immune_delay, time))
+                staying.append(person)
+
+        for person in recovered:
+            person.infected = False
+            person.symptomatic = False
+            person.immune = True
+            person.immune_time = min(person.immune_time, time)
+
+        for person in staying:
+            person.update_conditions(time=time)
+
+        self.mean_field = False
+        self.switches.append((time, label))
+        self._observations.clear()
+        self._last = None
+        world.aggregate = None
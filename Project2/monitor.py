@@ -0,0 +1,231 @@
+import asyncio
+import json
+import threading
+
+DASHBOARD = b"""<!DOCTYPE html>
+<html>
+<head><title>Simulation monitor</title></head>
+<body>
+<h3 id="time">Waiting for frames...</h3>
+<pre id="counts"></pre>
+<canvas id="world" width="500" height="500" style="border:1px solid #888"></canvas>
+<script>
+const colors = {S: 'green', I: 'red', Y: 'gold', Q: 'black', R: 'blue'};
+const source = new EventSource('/stream');
+source.onmessage = function (event) {
+    const frame = JSON.parse(event.data);
+    document.getElementById('time').textContent = 'Day: ' + Math.floor(frame.time / 24) + ' Hour: ' + frame.time % 24;
+    document.getElementById('counts').textContent = JSON.stringify(frame.counts, null, 1) +
+        '\\ndropped frames: ' + frame.dropped;
+    const canvas = document.getElementById('world'), ctx = canvas.getContext('2d');
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    for (const [x, y, state] of frame.positions || []) {
+        ctx.fillStyle = colors[state];
+        ctx.fillRect(x / frame.world_size[0] * canvas.width, canvas.height - y / frame.world_size[1] * canvas.height, 3, 3);
+    }
+};
+</script>
+</body>
+</html>
+"""
+
+
+class RingBuffer:
+
+    def __init__(self, capacity=256):
+        """
+        Bounded ring buffer with one producer (the simulation) and any number of readers. The producer never waits,
+        once the buffer is full the oldest frames are overwritten and readers that are behind lose them.
+        No locks are needed since single list item and attribute assignments are atomic in CPython: the slot is
+        written before the sequence number is published and every slot carries its own sequence number, so readers
+        can tell an overwritten slot from the one they asked for.
+        :param capacity: Maximum number of frames kept.
+        """
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self.written = 0    # Sequence number of the next frame.
+
+    def push(self, frame):
+        """
+        Adds a frame, overwriting the oldest one if the buffer is full.
+        :param frame: Frame to add.
+        """
+        seq = self.written
+        self._slots[seq % self.capacity] = (seq, frame)
+        self.written = seq + 1
+
+    def read(self, since):
+        """
+        Fetches all frames from sequence number since that are still in the buffer.
+        :param since: Sequence number of the first wanted frame.
+        :return: frames - List of frames.
+                 next_seq - Sequence number to read from next time.
+                 dropped - Number of wanted frames that were overwritten before they could be read.
+        """
+        end = self.written
+        start = max(since, end - self.capacity)
+        frames = []
+        for seq in range(start, end):
+            slot = self._slots[seq % self.capacity]
+            if slot is not None and slot[0] == seq:
+                frames.append(slot[1])
+
+        return frames, end, (end - since) - len(frames)
+
+    def latest(self):
+        """
+        :return: The newest frame, None if nothing has been pushed yet.
+        """
+        frames, _, _ = self.read(self.written - 1)
+        return frames[-1] if frames else None
+
+
+class Monitor:
+
+    def __init__(self, capacity=256, every=1, max_positions=0):
+        """
+        Live feed of the simulation. The simulator pushes a compact snapshot of the world every step into a ring
+        buffer, and consumers running in a separate thread (see start) serve them without ever blocking the
+        simulation. Slow or absent consumers only result in dropped frames.
+        :param capacity: Number of frames kept in the ring buffer.
+        :param every: Only every n:th step is pushed.
+        :param max_positions: Maximum number of (downsampled) positions per frame, 0 for counts only.
+        """
+        self.buffer = RingBuffer(capacity)
+        self.every = every
+        self.max_positions = max_positions
+        self.done = False
+
+        self._steps = 0
+        self._thread = None
+
+    def push(self, world, time):
+        """
+        Snapshots the world. Called by the simulator after every update.
+        :param world: World to snapshot.
+        :param time: Current time.
+        """
+        self._steps += 1
+        if self._steps % self.every:
+            return
+
+        frame = {'time': time, 'counts': world.census()}
+        if self.max_positions:
+            stride = max(1, len(world.persons) // self.max_positions)
+            frame['world_size'] = world.world_size
+            frame['positions'] = [(round(person.pos[0], 1), round(person.pos[1], 1), self._state(person))
+                                  for person in world.persons[::stride]]
+        self.buffer.push(frame)
+
+    @staticmethod
+    def _state(person):
+        """
+        :return: One letter state of a person, same precedence as in Simulator.display.
+        """
+        if person.immune:
+            return 'R'
+        elif person.quarantined:
+            return 'Q'
+        elif person.symptomatic:
+            return 'Y'
+        elif person.infected:
+            return 'I'
+        return 'S'
+
+    def start(self, port=None, host='127.0.0.1', path=None, interval=0.2):
+        """
+        Starts the consumers in a daemon thread with its own asyncio event loop.
+        :param port: Serves a dashboard on http://host:port/, frames as server sent events on /stream and the newest
+                     frame on /latest. None for no server.
+        :param host: Interface to serve on.
+        :param path: Appends frames as JSON lines to this file (for tail -f). None for no file.
+        :param interval: Seconds between polls of the ring buffer.
+        """
+        start = self.buffer.written    # Before the thread runs, so the file misses no frames pushed meanwhile.
+
+        async def run():
+            consumers = []
+            if port is not None:
+                consumers.append(self._serve(host, port, interval))
+            if path is not None:
+                consumers.append(self._tail(path, interval, start))
+            await asyncio.gather(*consumers)
+
+        self._thread = threading.Thread(target=asyncio.run, args=(run(),), name='monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Lets the consumers flush the remaining frames and waits for them to finish.
+        :param timeout: Maximum time in seconds to wait.
+        """
+        self.done = True
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    async def _frames(self, interval, since=None):
+        """
+        Polls the ring buffer until the monitor is stopped.
+        :param interval: Seconds between polls.
+        :param since: Sequence number of the first frame, None for the newest frame when the polling starts. Frames
+                      from since that are overwritten before the first poll are counted as dropped.
+        :return: Asynchronous generator of (frame, number of frames dropped so far).
+        """
+        if since is None:
+            since = max(0, self.buffer.written - 1)
+        dropped = 0
+        while True:
+            done = self.done
+            frames, since, _dropped = self.buffer.read(since)
+            dropped += _dropped
+            for frame in frames:
+                yield frame, dropped
+            if done:
+                return
+            await asyncio.sleep(interval)
+
+    async def _tail(self, path, interval, since):
+        """
+        Writes frames as JSON lines to a file, every frame from sequence number since.
+        """
+        with open(path, 'a') as f:
+            async for frame, dropped in self._frames(interval, since):
+                f.write(json.dumps(dict(frame, dropped=dropped)) + '\n')
+                f.flush()
+
+    async def _serve(self, host, port, interval):
+        """
+        Minimal HTTP server for the dashboard, one coroutine per client.
+        """
+        async def handle(reader, writer):
+            try:
+                request = await reader.readline()
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):    # Skip headers.
+                    pass
+                _, route, _ = request.decode().split(' ', 2)
+
+                if route == '/stream':
+                    writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n\r\n')
+                    async for frame, dropped in self._frames(interval):
+                        writer.write(b'data: ' + json.dumps(dict(frame, dropped=dropped)).encode() + b'\n\n')
+                        await writer.drain()    # Only stalls this client, the ring buffer keeps moving.
+                    return
+
+                if route == '/latest':
+                    body, content_type = json.dumps(self.buffer.latest()).encode(), b'application/json'
+                else:
+                    body, content_type = DASHBOARD, b'text/html'
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: ' + content_type +
+                             b'\r\nContent-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body)
+                await writer.drain()
+
+            except (ConnectionError, ValueError):
+                pass
+
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(handle, host, port)
+        async with server:
+            while not self.done:
+                await asyncio.sleep(interval)
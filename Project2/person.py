@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from rng import WALK, INFECT, GO_HOME
 import math
 import random as rnd
 
@@ -41,6 +42,11 @@ class Person(ABC):
         self.exposures = []         # All exposures.
         self.known_exposures = []   # Exposure where person was exposed by someone with symptoms.
 
+        # Set by a seeded world, then every random decision is drawn from the counter based rng (see rng.py).
+        self.id = None
+        self.rng = None
+        self.step = 0
+
     def infect(self, other, time):
         """
         Function that tries to spread infection from self to other.
@@ -89,6 +95,18 @@ class Person(ABC):
             if not isinstance(self, RandomPerson):
                 self.quarantine = True
 
+    def _random(self, purpose, draw=0):
+        """
+        Random number for a decision of this person at the current step. Drawn from the counter based rng of the
+        world if it is seeded, otherwise from the global random module.
+        :param purpose: What the number is used for, see rng.py.
+        :param draw: Number of the draw, for decisions needing several numbers.
+        :return: Uniform random float in [0, 1).
+        """
+        if self.rng is None:
+            return rnd.random()
+        return self.rng.random(self.id, self.step, purpose, draw)
+
     def dist(self, other):
         """
         Calculates (2D) distance from self to other.
@@ -144,8 +162,10 @@ class Person(ABC):
         :return: New position.
         """
         new_pos = (-1, -1)
+        draw = 0
         while not self._inside(world_size, new_pos):
-            angle = rnd.uniform(0, 2 * math.pi)
+            angle = 2 * math.pi * self._random(WALK, draw)
+            draw += 1
             dx, dy = self.speed * math.cos(angle), self.speed * math.sin(angle)
             x, y = self.pos
             new_pos = (x + dx, y + dy)
@@ -211,7 +231,7 @@ class RandomPerson(Person):
         :param other: Other person.
         :param time: Current time
         """
-        if rnd.random() < self.infection_prob:
+        if self._random(INFECT, other.id) < self.infection_prob:
             other.gets_infected(time)
 
 
@@ -262,7 +282,7 @@ class QuarantinePerson(Person):
        :param other: Other person.
        :param time: Current time
        """
-        if rnd.random() < self.infection_prob:
+        if self._random(INFECT, other.id) < self.infection_prob:
             other.gets_infected(time=time)
 
 
@@ -320,7 +340,7 @@ class Worker(Person):
                         self.work.pos[1] + self._carry * dt * (self.home.pos[1] - self.work.pos[1]))    # Going home.
             self._carry += 1
 
-        elif 17 < today_time <= rnd.uniform(17, 22):    # Has a random chance to go home prior to 22.
+        elif 17 < today_time <= 17 + 5 * self._random(GO_HOME):    # Has a random chance to go home prior to 22.
             self.pos = self.random_walk(world_size=world_size)
 
         else:
@@ -343,5 +363,5 @@ class Worker(Person):
         else:
             infection_prob = self.infection_prob
 
-        if rnd.random() < infection_prob:
+        if self._random(INFECT, other.id) < infection_prob:
             other.gets_infected(time=time)
@@ -0,0 +1,72 @@
+MASK = 0xFFFFFFFF
+
+PHILOX_M0, PHILOX_M1 = 0xD2511F53, 0xCD9E8D57    # Multipliers of Philox4x32.
+PHILOX_W0, PHILOX_W1 = 0x9E3779B9, 0xBB67AE85    # Key schedule (Weyl sequence).
+
+# Purposes of the random decisions in the simulation, part of the counter so that different decisions of the same
+# person at the same time never share random numbers.
+WALK = 0
+INFECT = 1
+GO_HOME = 2
+HYBRID = 3
+
+
+def philox(counter, key, rounds=10):
+    """
+    Philox4x32 counter based random number generator (Salmon et al. 2011, "Parallel random numbers: as easy as
+    1, 2, 3"). Maps a counter and a key to four random 32 bit words, without any state.
+    :param counter: Four 32 bit integers.
+    :param key: Two 32 bit integers.
+    :param rounds: Number of rounds. (Default=10)
+    :return: Tuple of four random 32 bit integers.
+    """
+    c0, c1, c2, c3 = counter
+    k0, k1 = key
+    for _ in range(rounds):
+        p0, p1 = PHILOX_M0 * c0, PHILOX_M1 * c2
+        c0, c1, c2, c3 = ((p1 >> 32) ^ c1 ^ k0) & MASK, p1 & MASK, ((p0 >> 32) ^ c3 ^ k1) & MASK, p0 & MASK
+        k0, k1 = (k0 + PHILOX_W0) & MASK, (k1 + PHILOX_W1) & MASK
+    return c0, c1, c2, c3
+
+
+class CounterRNG:
+
+    def __init__(self, seed, antithetic=False):
+        """
+        Random streams where every number is a pure function of (seed, agent, step, purpose, draw). The same decision
+        gets the same random number no matter in which order the persons are updated, or in which process.
+        :param seed: Seed of the simulation (up to 64 bits).
+        :param antithetic: True for the antithetic streams, every uniform u of random becomes 1 - u. Only the draws
+                           during the simulation are flipped, the construction of the world (population, delays)
+                           uses the global random module and is shared by a run and its antithetic twin.
+        """
+        self.seed = seed
+        self.key = (seed & MASK, (seed >> 32) & MASK)
+        self.antithetic = antithetic
+
+    def words(self, agent, step, purpose, draw=0):
+        """
+        :param agent: Id of the person making the decision.
+        :param step: Time of the decision, as an integer.
+        :param purpose: What the number is used for, see the constants in this module.
+        :param draw: Number of the draw, for decisions needing several numbers (eg. rejection sampling).
+        :return: Four random 32 bit integers.
+        """
+        return philox((agent & MASK, step & MASK, purpose & MASK, draw & MASK), self.key)
+
+    def random(self, agent, step, purpose, draw=0):
+        """
+        :return: Uniform random float in [0, 1) with 53 bits of precision. See words for the parameters.
+        """
+        c0, c1, _, _ = self.words(agent, step, purpose, draw)
+        u = ((c0 >> 5) * 67108864 + (c1 >> 6)) / 9007199254740992
+        return 1 - u if self.antithetic and u else u
+
+
+def time_to_step(time):
+    """
+    Converts a simulation time (hours) to an integer for the counter, independent of the step size.
+    :param time: Time in hours.
+    :return: Time in whole seconds.
+    """
+    return int(round(time * 3600))
@@ -0,0 +1,64 @@
+import math
+
+
+class SEIR:
+
+    """
+    SEIR class for modelling diseases, same model as StaticSEIR in Project1 but without numpy/pandas so that it can
+    run next to the agent based simulation.
+
+    Model:
+    dS/dt = -beta * S * I
+    dE/dt = beta * S * I - rho * E
+    dI/dt = rho * E - gam * I
+    dR/dt = gam * I
+
+    With rho = None there is no latent period (SIR), new infections go straight to I and E stays constant.
+    """
+
+    def __init__(self, init_values=(99, 0, 1, 0)):
+        """
+        Initialization method, holds initial values.
+        :(Optional) param init_values: Starting values: [Susceptible, Exposed, Infected, Recovered] = [s0, e0, i0, r0]
+        """
+        self.init_values = tuple(init_values)
+
+    def model(self, curr_state, params):
+        """
+        Model function which returns derivatives at current point.
+        :param curr_state: Current model state, ex: [Susceptible, Exposed, Infected, Recovered] = [100, 20, 10, 50]
+        :param params: Model parameters (beta, rho, gam).
+        :return: Tuple of derivatives at current point.
+        """
+        S, E, I, R = curr_state
+        beta, rho, gam = params
+
+        infections = beta * S * I
+        if rho is None:
+            return -infections, 0, infections - gam * I, gam * I
+
+        return -infections, infections - rho * E, rho * E - gam * I, gam * I
+
+    def step(self, curr_state, params, step_size):
+        """
+        One step of the euler-method updating scheme.
+        :param curr_state: Current model state.
+        :param params: Model parameters (beta, rho, gam).
+        :param step_size: Step size.
+        :return: Next model state.
+        """
+        return tuple(x + step_size * dx for x, dx in zip(curr_state, self.model(curr_state, params)))
+
+    def solve(self, params, days=100, step_size=0.01):
+        """
+        Solves the initial value problem using the euler-method updating scheme.
+        :param params: Model parameters (beta, rho, gam).
+        :(Optional) param days: Number of days for simulation. (Default=100)
+        :(Optional) param step_size: Step_size for euler-method. (Default=0.01)
+        :return: List of model states, one per step.
+        """
+        steps = math.ceil(days / step_size) + 1
+        seir = [self.init_values]
+        for _ in range(1, steps):
+            seir.append(self.step(seir[-1], params, step_size))
+        return seir
@@ -1,6 +1,4 @@
-import matplotlib.pyplot as plt
 import statistics as stat
-import seaborn as sns
 
 
 class Simulator:
@@ -13,11 +11,12 @@ class Simulator:
         :param world: List of persons.
         """
         self.world = world
-        self.fig, self.ax = plt.subplots(figsize=(16, 9))
+        self.fig, self.ax = None, None  # Created on first display, so headless runs never load matplotlib.
         self.disp = False
         self.prog = 1
 
-    def simulate(self, time=0, dt=1, sim_time=50 * 24, disp=False, see_progress=False):
+    def simulate(self, time=0, dt=1, sim_time=50 * 24, disp=False, see_progress=False,
+                 monitor=None, stop=None, hybrid=None):
         """
         Simulates the infection spreading throughout the world.
         :param time: Start time.
@@ -25,6 +24,11 @@ class Simulator:
         :param sim_time: Simulation duration.
         :param disp: True for visual simulation, false else.
         :param see_progress: True for print outs of % done of the simulation.
+        :param monitor: Monitor which is fed a snapshot of the world every step (see monitor.py), None for no feed.
+        :param stop: Function stop(world, time) called after every step, the simulation is aborted once it returns True.
+        :param hybrid: Hybrid which hands the simulation to a mean field model while the prevalence is high (see
+                       hybrid.py), None for agents only.
+        :return: Time when the simulation ended.
         """
         self.disp = disp
         while time < sim_time:
@@ -32,17 +36,34 @@ class Simulator:
                 if 100 * (time / sim_time) > self.prog:
                     print(f'{self.prog:.2f}%')
                     self.prog += 1
-            self.world.update(time=time, dt=dt)
+            if hybrid is not None and hybrid.mean_field:
+                hybrid.step(self.world, time=time, dt=dt)
+            else:
+                self.world.update(time=time, dt=dt)
+                if hybrid is not None:
+                    hybrid.observe(self.world, time=time, dt=dt)
+            if monitor is not None:
+                monitor.push(self.world, time)
             if disp:
                 self.display(time)
+            if stop is not None and stop(self.world, time):
+                break
             time += dt
 
+        if hybrid is not None:
+            hybrid.finish(self.world)
         self.prog = 1
+        return time
 
     def display(self, time):
         """
         Visualises the spreading of infection throughout time.
         """
+        import matplotlib.pyplot as plt
+
+        if self.ax is None:
+            self.fig, self.ax = plt.subplots(figsize=(16, 9))
+
         x_ninf, y_ninf = [], []
         x_inf, y_inf = [], []
         x_quar, y_quar = [], []
@@ -117,6 +138,9 @@ class Simulator:
         """
         Plots the Infected time distributions.
         """
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
         res = self.get_infection_time_distributions()
 
         methods = ['one known', 'average', 'true']
@@ -169,30 +193,3 @@ class Simulator:
                 true_infection_time.append((person.immune_time - person.infected_time)/24)
 
         return one_known_exposure_infection_time, average_known_exposure_infection_time, true_infection_time
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
@@ -1,13 +1,26 @@
+from rng import CounterRNG, time_to_step
+
+
 class World:
 
-    def __init__(self, world_size, persons, buildings):
+    def __init__(self, world_size, persons, buildings, seed=None):
         """
         Initialization class for a world. A world is defined as holding some persons inside and having some size.
         :param world_size: Dimensions of the world.
+        :param seed: Seed for counter based random numbers. If given, every random decision is a pure function of
+                     (seed, person, time, purpose) and the world is updated synchronously, so the result does not depend
+                     on the order of the persons. None for the global random module and the sequential update.
         """
         self.world_size = world_size
         self.persons = persons
         self.buildings = buildings
+        self.aggregate = None   # Counts of a mean field model while it runs instead of the persons (see hybrid.py).
+
+        self.rng = None if seed is None else CounterRNG(seed)
+        if self.rng is not None:
+            for i, person in enumerate(self.persons):
+                person.id = i
+                person.rng = self.rng
 
     def update(self, time, dt=None):
         """
@@ -16,6 +29,15 @@ class World:
         :param time: Current time.
         :param dt:
         """
+        if self.rng is not None:
+            step = time_to_step(time)
+            for person in self.persons:
+                person.step = step
+
+            self.move_people(today_time=time % 24, dt=dt)
+            self._synchronous_infections(time)
+            return
+
         self.move_people(today_time=time % 24, dt=dt)
         for person in self.persons:
             for other in self.persons:
@@ -26,6 +48,22 @@ class World:
 
                 person.update_conditions(time=time)
 
+    def _synchronous_infections(self, time):
+        """
+        Spreads infection from the persons that were infected at the start of the step only, then updates every
+        persons conditions. Someone infected during the step can not infect others until the next step, which makes
+        the outcome independent of the order of the persons (given counter based random numbers).
+        :param time: Current time.
+        """
+        infectious = [person for person in self.persons if person.infected]
+        for person in infectious:
+            for other in self.persons:
+                if person is not other:
+                    person.infect(other, time)
+
+        for person in self.persons:
+            person.update_conditions(time=time)
+
     def move_people(self, today_time, dt):
         """
         Functions that moves all persons in the world.
@@ -34,3 +72,27 @@ class World:
         """
         for person in self.persons:
             person.move(today_time=today_time, world_size=self.world_size, dt=dt)
+
+    def census(self):
+        """
+        Counts the number of persons in each state of the disease.
+        :return: Dictionary with the number of immunes, symptomatic, infected and never infected persons.
+        """
+        if self.aggregate is not None:
+            return dict(self.aggregate)
+
+        counts = {'immunes': 0, 'symptomatic': 0, 'infected': 0, 'never_infected': 0}
+        for person in self.persons:
+            if person.immune:
+                counts['immunes'] += 1
+
+            elif person.symptomatic:
+                counts['symptomatic'] += 1
+
+            elif person.infected:
+                counts['infected'] += 1
+
+            else:
+                counts['never_infected'] += 1
+
+        return counts
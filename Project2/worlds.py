@@ -0,0 +1,207 @@
+from person import RandomPerson, QuarantinePerson, Worker
+from building import Building
+from world import World
+import random as rnd
+
+
+def _streams(seed):
+    """
+    Random streams for the construction of a world. A seeded world gets separate streams for placing people and
+    buildings, for the course of the disease (delays) and for choosing the initially infected. Worlds of different
+    types built with the same seed then share the same delays and initially infected persons, which makes them
+    directly comparable (common random numbers).
+    :param seed: Seed of the world, None for the global random module.
+    :return: place, course, choice - Random streams.
+    """
+    if seed is None:
+        return rnd, rnd, rnd
+    return rnd.Random(f'{seed}:place'), rnd.Random(f'{seed}:course'), rnd.Random(f'{seed}:choice')
+
+
+def _bind(func, stream):
+    """
+    Rebinds a function of the global random module (eg. rnd.gauss) to a stream, other functions are kept.
+    """
+    if isinstance(getattr(func, '__self__', None), rnd.Random):
+        return getattr(stream, func.__name__)
+    return func
+
+
+def random_world(world_size=(1000, 1000), num_people=500, num_initially_infected=1,  pop_distr=(0.6, 0.3, 0.1),
+                 infection_prob=0.02, infection_dist=2, speed=10, avg_persons_per_household=4,
+                 avg_pupils_per_school=100, avg_persons_per_workplace=50, tightness=(0.9, 0.3, 0.1),
+                 delay=(rnd.gauss, 7, 1), recovery=(rnd.gauss, 14, 2), seed=None):
+
+    """
+    Constructs a society with Random walkers.
+    :param world_size: Size of the world.
+    :param num_people: Number of people in the world.
+    :param num_initially_infected: Number of initially infected
+    :param pop_distr: Proportions of people. Eg. (0.6, 0.3, 0.1) means 60% workers, 30% students and 10% others.
+    :param infection_prob: Probability of infecting.
+    :param infection_dist: Max distance infection can spread.
+    :param speed: Speed of person.
+    :param avg_persons_per_household: Average number people living in a house.
+    :param avg_pupils_per_school: Average number of students per school.
+    :param avg_persons_per_workplace: Average number of people per work place.
+    :param tightness: Tightness scaling parameter to tackle differences in sparseness and denseness in different buildings.
+    :param delay: Delay information, (density function, parameter 1, parameter 2)
+    :param recovery: Recovery information, (density function, parameter 1, parameter 2)
+    :param seed: Seed for the construction (see _streams) and for counter based random numbers during the simulation
+                 (see World), None for the global random module.
+    :return: World.
+    """
+    world_size = world_size
+    num_people = num_people
+
+    place, course, choice = _streams(seed)
+    random_pos = lambda _: (place.uniform(0, world_size[0]), place.uniform(0, world_size[1]))
+
+    delay_func, delay_param1, delay_param2 = delay
+    recovery_func, recovery_param1, recovery_param2 = recovery
+    delay_func, recovery_func = _bind(delay_func, course), _bind(recovery_func, course)
+
+    persons = [RandomPerson(infected=False, starting_pos=random_pos(None), speed=speed, infection_dist=infection_dist,
+                            infection_prob=infection_prob, symptom_delay=delay_func(delay_param1, delay_param2),
+                            time_until_recovery=recovery_func(recovery_param1, recovery_param2), home=None,
+                            work=None) for _ in range(num_people)]
+
+    choice.shuffle(persons)
+    for i in range(num_initially_infected):
+        persons[i].gets_infected(time=0)
+
+    return World(world_size=world_size, persons=persons, buildings=[], seed=seed)
+
+
+def quarantine_world(world_size=(1000, 1000), num_people=500, num_initially_infected=1, pop_distr=(0.6, 0.3, 0.1),
+                     infection_prob=0.02, infection_dist=2, speed=10, avg_persons_per_household=4,
+                     avg_pupils_per_school=100, avg_persons_per_workplace=50, tightness=(0.9, 0.3, 0.1),
+                     delay=(rnd.gauss, 7, 1), recovery=(rnd.gauss, 14, 2), seed=None):
+
+    """
+    Constructs a society with Quarantine persons.
+    :param world_size: Size of the world.
+    :param num_people: Number of people in the world.
+    :param num_initially_infected: Number of initially infected.
+    :param pop_distr: Proportions of people. Eg. (0.6, 0.3, 0.1) means 60% workers, 30% students and 10% others.
+    :param infection_prob: Probability of infecting.
+    :param infection_dist: Max distance infection can spread.
+    :param speed: Speed of person.
+    :param avg_persons_per_household: Average number people living in a house.
+    :param avg_pupils_per_school: Average number of students per school.
+    :param avg_persons_per_workplace: Average number of people per work place.
+    :param tightness: Tightness scaling parameter to tackle differences in sparseness and denseness in different buildings.
+    :param delay: Delay information, (density function, parameter 1, parameter 2)
+    :param recovery: Recovery information, (density function, parameter 1, parameter 2)
+    :param seed: Seed for the construction (see _streams) and for counter based random numbers during the simulation
+                 (see World), None for the global random module.
+    :return: World.
+    """
+
+    world_size = world_size
+    num_people = num_people
+
+    place, course, choice = _streams(seed)
+    random_pos = lambda _: (place.uniform(0, world_size[0]), place.uniform(0, world_size[1]))
+
+    homes = [Building(pos=random_pos(None), _type='Home', tightness=tightness[0])
+             for _ in range(max(1, num_people // avg_persons_per_household))]
+
+    # Starts at home:
+    home_which_people_live_in = [place.choice(homes) for _ in range(num_people)]
+
+    delay_func, delay_param1, delay_param2 = delay
+    recovery_func, recovery_param1, recovery_param2 = recovery
+    delay_func, recovery_func = _bind(delay_func, course), _bind(recovery_func, course)
+
+    persons = [QuarantinePerson(infected=False, starting_pos=home_which_people_live_in[person].pos, speed=speed,
+                                infection_dist=infection_dist, infection_prob=infection_prob,
+                                symptom_delay=delay_func(delay_param1, delay_param2),
+                                time_until_recovery=recovery_func(recovery_param1, recovery_param2),
+                                home=home_which_people_live_in[person], work=None)
+               for person in range(num_people)]
+
+    choice.shuffle(persons)
+    for i in range(num_initially_infected):
+        persons[i].gets_infected(time=0)
+
+    return World(world_size=world_size, persons=persons, buildings=homes, seed=seed)
+
+
+def worker_world(world_size=(1000, 1000), num_people=500, num_initially_infected=1, pop_distr=(0.6, 0.3, 0.1),
+                 infection_prob=0.02, infection_dist=2, speed=10, avg_persons_per_household=4,
+                 avg_pupils_per_school=100, avg_persons_per_workplace=50, tightness=(0.9, 0.3, 0.1),
+                 delay=(rnd.gauss, 7, 1), recovery=(rnd.gauss, 14, 2), seed=None):
+
+    """
+    Constructs a society with workers, students and others.
+    :param world_size: Size of the world.
+    :param num_people: Number of people in the world.
+    :param num_initially_infected: Number of initially infected.
+    :param pop_distr: Proportions of people. Eg. (0.6, 0.3, 0.1) means 60% workers, 30% students and 10% others.
+    :param infection_prob: Probability of infecting.
+    :param infection_dist: Max distance infection can spread.
+    :param speed: Speed of person.
+    :param avg_persons_per_household: Average number people living in a house.
+    :param avg_pupils_per_school: Average number of students per school.
+    :param avg_persons_per_workplace: Average number of people per work place.
+    :param tightness: Tightness scaling parameter to tackle differences in sparseness and denseness in different buildings.
+    :param delay: Delay information, (density function, parameter 1, parameter 2)
+    :param recovery: Recovery information, (density function, parameter 1, parameter 2)
+    :param seed: Seed for the construction (see _streams) and for counter based random numbers during the simulation
+                 (see World), None for the global random module.
+    :return: World.
+    """
+
+    world_size = world_size
+    num_people = num_people
+
+    pop_distr = pop_distr   # Proportion that oes to school, works, other such as infants and elderly.
+
+    num_young, num_workers, num_other = [int(num_people * prop) for prop in pop_distr]
+
+    place, course, choice = _streams(seed)
+    random_pos = lambda _: (place.uniform(0, world_size[0]), place.uniform(0, world_size[1]))
+
+    homes = [Building(pos=random_pos(None), _type='Home', tightness=tightness[0])
+             for _ in range(max(1, num_people // avg_persons_per_household))]
+    schools = [Building(pos=random_pos(None), _type='School', tightness=tightness[1])
+               for _ in range(max(1, num_young // avg_pupils_per_school))]
+    works = [Building(pos=random_pos(None), _type='Work', tightness=tightness[2])
+             for _ in range(max(1, num_workers // avg_persons_per_workplace))]
+
+    # Starts at home:
+    home_which_people_live_in = [place.choice(homes) for _ in range(num_people)]
+
+    delay_func, delay_param1, delay_param2 = delay
+    recovery_func, recovery_param1, recovery_param2 = recovery
+    delay_func, recovery_func = _bind(delay_func, course), _bind(recovery_func, course)
+
+    youngs = [Worker(infected=False, starting_pos=home_which_people_live_in[person].pos, speed=speed,
+                     infection_dist=infection_dist, infection_prob=infection_prob,
+                     symptom_delay=delay_func(delay_param1, delay_param2),
+                     time_until_recovery=recovery_func(recovery_param1, recovery_param2),
+                     home=home_which_people_live_in[person],
+                     work=place.choice(schools)) for person in range(0, num_young)]
+
+    workers = [Worker(infected=False, starting_pos=home_which_people_live_in[person].pos, speed=speed,
+                      infection_dist=infection_dist, infection_prob=infection_prob,
+                      symptom_delay=delay_func(delay_param1, delay_param2),
+                      time_until_recovery=recovery_func(recovery_param1, recovery_param2),
+                      home=home_which_people_live_in[person], work=place.choice(works))
+               for person in range(num_young, num_young + num_workers)]
+
+    others = [QuarantinePerson(infected=False, starting_pos=home_which_people_live_in[person].pos, speed=speed,
+                               infection_dist=infection_dist, infection_prob=infection_prob,
+                               symptom_delay=delay_func(delay_param1, delay_param2),
+                               time_until_recovery=recovery_func(recovery_param1, recovery_param2),
+                               home=home_which_people_live_in[person], work=None)
+              for person in range(num_young + num_workers, num_young + num_workers + num_other)]
+
+    persons = youngs + workers + others
+
+    choice.shuffle(persons)
+    for i in range(num_initially_infected):
+        persons[i].gets_infected(time=0)
+
+    return World(world_size=world_size, persons=persons, buildings=homes + schools + works, seed=seed)
@@ -0,0 +1,200 @@
+import math
+import numpy as np
+
+
+def moving_average(signals, order):
+    """
+    Centered moving average of many signals at once. Gives the same result as ma in Project1 (convolution with a
+    normalized uniform window, zero padded at the ends) for every row. For even orders the window is
+    [t - order/2, t + order/2 - 1] and the output keeps the length of the signal.
+    :param signals: Array of shape (regions, days), or a single signal.
+    :param order: Length of the uniform window.
+    :return: Array of the same shape as signals.
+    """
+    signals = np.asarray(signals, dtype=float)
+    shift = order // 2
+    padded = np.pad(signals, [(0, 0)] * (signals.ndim - 1) + [(shift, order - 1 - shift)])
+    cumsum = np.cumsum(padded, axis=-1)
+    cumsum = np.concatenate([np.zeros(signals.shape[:-1] + (1,)), cumsum], axis=-1)
+    return (cumsum[..., order:] - cumsum[..., :-order]) / order
+
+
+def growth_rate(signals, lag=1):
+    """
+    Exponential growth rate r(t) = (log y(t) - log y(t - lag)) / lag per day.
+    :param signals: Array of shape (regions, days), preferably smoothed.
+    :param lag: Number of days to compare over.
+    :return: Array of the same shape as signals, nan where undefined (first lag days or non positive values).
+    """
+    signals = np.asarray(signals, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log = np.where(signals > 0, np.log(np.where(signals > 0, signals, 1)), np.nan)
+    rates = np.full(signals.shape, np.nan)
+    rates[..., lag:] = (log[..., lag:] - log[..., :-lag]) / lag
+    return rates
+
+
+def doubling_time(rates):
+    """
+    Doubling time log(2) / r(t) in days.
+    :param rates: Growth rates, see growth_rate.
+    :return: Array of doubling times, nan where the signal is not growing.
+    """
+    rates = np.asarray(rates, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(rates > 0, math.log(2) / rates, np.nan)
+
+
+def serial_interval_weights(mean, sd, length=20):
+    """
+    Discretized gamma distribution of the serial interval, w(k) for k = 1, ..., length.
+    :param mean: Mean serial interval in days.
+    :param sd: Standard deviation of the serial interval in days.
+    :param length: Maximum serial interval in days.
+    :return: Array of normalized weights, index 0 corresponds to k = 1.
+    """
+    shape, scale = (mean / sd) ** 2, sd ** 2 / mean
+    k = np.arange(1, length + 1)
+    log_pdf = (shape - 1) * np.log(k) - k / scale - math.lgamma(shape) - shape * math.log(scale)
+    weights = np.exp(log_pdf)
+    return weights / weights.sum()
+
+
+def infection_pressure(incidence, weights):
+    """
+    Total infectiousness Lambda(t) = sum_k w(k) I(t - k) of the earlier cases.
+    :param incidence: Array of shape (regions, days).
+    :param weights: Serial interval weights, see serial_interval_weights.
+    :return: Array of the same shape as incidence.
+    """
+    incidence = np.asarray(incidence, dtype=float)
+    pressure = np.zeros(incidence.shape)
+    days = incidence.shape[-1]
+    for k, w in enumerate(weights[:days - 1], start=1):
+        pressure[..., k:] += w * incidence[..., :-k]
+    return pressure
+
+
+def _window_sum(signals, window):
+    """
+    Sum over the trailing window, nan for the first window - 1 days.
+    """
+    cumsum = np.cumsum(signals, axis=-1)
+    sums = np.full(signals.shape, np.nan)
+    sums[..., window - 1:] = cumsum[..., window - 1:]
+    sums[..., window:] -= cumsum[..., :-window]
+    return sums
+
+
+def cori_rt(incidence, weights, window=7, a=1, b=5):
+    """
+    Instantaneous reproduction number R(t) with the method of Cori et al. (2013): a gamma(a, b) prior updated with
+    the cases and the total infectiousness in the trailing window.
+    :param incidence: Array of shape (regions, days).
+    :param weights: Serial interval weights, see serial_interval_weights.
+    :param window: Length of the trailing window in days.
+    :param a: Shape of the gamma prior.
+    :param b: Scale of the gamma prior.
+    :return: mean - Posterior mean of R(t), nan for the first window - 1 days.
+             std - Posterior standard deviation of R(t).
+    """
+    incidence = np.asarray(incidence, dtype=float)
+    shape = a + _window_sum(incidence, window)
+    scale = 1 / (1 / b + _window_sum(infection_pressure(incidence, weights), window))
+    return shape * scale, np.sqrt(shape) * scale
+
+
+def analyse(incidence, order=7, lag=1, weights=None, window=7):
+    """
+    Runs the whole analysis on all regions at once.
+    :param incidence: Array of daily cases (or deaths) of shape (regions, days).
+    :param order: Length of the moving average window.
+    :param lag: Number of days for the growth rate.
+    :param weights: Serial interval weights. (Default=serial_interval_weights(6.48, 3.83), covid-19 serial interval
+                    from Ferguson et al. 2020)
+    :param window: Length of the window for R(t).
+    :return: Dictionary of arrays of shape (regions, days): 'ma', 'growth_rate', 'doubling_time', 'rt', 'rt_std'.
+    """
+    weights = serial_interval_weights(6.48, 3.83) if weights is None else weights
+    smoothed = moving_average(incidence, order)
+    rates = growth_rate(smoothed, lag)
+    rt, rt_std = cori_rt(incidence, weights, window)
+    return {'ma': smoothed, 'growth_rate': rates, 'doubling_time': doubling_time(rates), 'rt': rt, 'rt_std': rt_std}
+
+
+class RollingSurveillance:
+
+    def __init__(self, regions, order=7, lag=1, weights=None, window=7):
+        """
+        Keeps the analysis (see analyse) of many regions up to date as new days are appended. Appending only
+        recomputes the trailing days that depend on the new data, the results are the same as running analyse on
+        the full history.
+        :param regions: Number of regions.
+        :param order: Length of the moving average window.
+        :param lag: Number of days for the growth rate.
+        :param weights: Serial interval weights, see analyse.
+        :param window: Length of the window for R(t).
+        """
+        self.regions = regions
+        self.order = order
+        self.lag = lag
+        self.weights = serial_interval_weights(6.48, 3.83) if weights is None else weights
+        self.window = window
+        self.days = 0
+
+        self._incidence = np.zeros((regions, 64))
+        self._results = {key: np.full((regions, 64), np.nan) for key in ('ma', 'growth_rate', 'doubling_time',
+                                                                          'rt', 'rt_std')}
+
+    @property
+    def incidence(self):
+        """
+        :return: All appended days, array of shape (regions, days).
+        """
+        return self._incidence[:, :self.days]
+
+    def __getitem__(self, key):
+        """
+        :param key: 'ma', 'growth_rate', 'doubling_time', 'rt' or 'rt_std'.
+        :return: Array of shape (regions, days).
+        """
+        return self._results[key][:, :self.days]
+
+    def append(self, new_days):
+        """
+        Appends new days and updates the analysis of the days affected by them.
+        :param new_days: Array of shape (regions,) for one day or (regions, days).
+        :return: Index of the first day whose results changed.
+        """
+        new_days = np.asarray(new_days, dtype=float).reshape(self.regions, -1)
+        start, self.days = self.days, self.days + new_days.shape[1]
+        self._reserve(self.days)
+        self._incidence[:, start:self.days] = new_days
+
+        # The moving average of the last days before start changes (zero padding to the right), and with it the
+        # growth rate lag days later. Those days in turn need a context of earlier days for a correct recomputation.
+        shift = self.order // 2
+        first_changed = max(0, start - (self.order - 1 - shift) - self.lag)
+        context = max(shift + self.lag, self.window - 1 + len(self.weights))
+        segment_start = max(0, first_changed - context)
+
+        results = analyse(self._incidence[:, segment_start:self.days], self.order, self.lag, self.weights,
+                          self.window)
+        for key, values in results.items():
+            self._results[key][:, first_changed:self.days] = values[:, first_changed - segment_start:]
+
+        return first_changed
+
+    def _reserve(self, days):
+        """
+        Grows the buffers (doubling) so that they hold at least days days.
+        """
+        capacity = self._incidence.shape[1]
+        if days <= capacity:
+            return
+
+        while capacity < days:
+            capacity *= 2
+        pad = [(0, 0), (0, capacity - self._incidence.shape[1])]
+        self._incidence = np.pad(self._incidence, pad)
+        self._results = {key: np.pad(values, pad, constant_values=np.nan) for key, values in self._results.items()}